@@ -1,52 +1,137 @@
 """使用 Microsoft Graph API 读取 Outlook 邮件"""
 
+import re
 import requests
+from requests.adapters import HTTPAdapter
 import time
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+from urllib.parse import urlencode, quote
+from typing import Optional, Dict, Tuple
+from datetime import datetime, timedelta, timezone
+
+# 常见验证链接模式（按优先级排列）
+_VERIFY_PATTERNS = [
+    re.compile(p) for p in (
+        r'https://www\.ohmygpt\.com/[^\s"<>]+',
+        r'https://ohmygpt\.com/[^\s"<>]+',
+        r'http[s]?://[^\s"<>]+verify[^\s"<>]*',
+    )
+]
+
+# 轮询时只请求需要的字段，避免下载完整邮件负载
+MESSAGE_SELECT = "id,subject,from,receivedDateTime,bodyPreview,body"
+# 仅用于按主题/发件人筛选的精简字段
+MESSAGE_SUMMARY_SELECT = "id,subject,from,receivedDateTime"
 
 class OutlookGraphEmailHandler:
     """使用 Graph API 处理 Outlook 邮箱"""
 
+    # 进程内 token 缓存 {email: (access_token, 过期时间戳)}，重试时复用未过期的 token
+    _token_cache: Dict[str, Tuple[str, float]] = {}
+
+    # 提前刷新的安全余量（秒）
+    TOKEN_EXPIRY_MARGIN = 60
+
     def __init__(self, email: str, client_id: str, refresh_token: str):
         self.email = email
         self.client_id = client_id
         self.refresh_token = refresh_token
         self.access_token = None
+        self.token_expiry = 0.0
+
+        # 复用同一个 Session，保持与登录/Graph 服务器的长连接，避免每次轮询重新握手
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount("https://login.microsoftonline.com", adapter)
+        self.session.mount("https://graph.microsoft.com", adapter)
+
+        cached = self._token_cache.get(email)
+        if cached and time.time() < cached[1]:
+            self._set_token(*cached)
+
+    def close(self):
+        """关闭 HTTP 会话"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def get_access_token(self) -> str:
         """获取 Access Token"""
-        res = requests.post(
+        res = self.session.post(
             "https://login.microsoftonline.com/common/oauth2/v2.0/token",
             data={
                 "client_id": self.client_id,
                 "grant_type": "refresh_token",
                 "refresh_token": self.refresh_token,
                 "scope": "https://graph.microsoft.com/.default"
-            }
+            },
+            # 刷新 token 时不携带旧的 Bearer 头
+            headers={"Authorization": None}
         )
 
         if res.status_code != 200:
             raise Exception(f"获取 Access Token 失败: {res.text}")
 
-        self.access_token = res.json()["access_token"]
+        j = res.json()
+        expiry = time.time() + j.get("expires_in", 3600) - self.TOKEN_EXPIRY_MARGIN
+        self._set_token(j["access_token"], expiry)
+        self._token_cache[self.email] = (self.access_token, self.token_expiry)
         return self.access_token
 
-    def get_messages(self, folder: str = "inbox", top: int = 50) -> list:
+    def _set_token(self, access_token: str, expiry: float):
+        """记录 token 及过期时间，并设置为 Session 默认认证头"""
+        self.access_token = access_token
+        self.token_expiry = expiry
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    def ensure_token(self):
+        """仅在没有 token 或 token 已过期时刷新"""
+        if self.access_token is None or time.time() >= self.token_expiry:
+            self.get_access_token()
+
+    @staticmethod
+    def _build_query(
+        top: int,
+        filter_query: Optional[str] = None,
+        select: Optional[str] = None,
+        orderby: Optional[str] = None
+    ) -> Dict:
+        """构造 OData 查询参数"""
+        params = {"$top": top}
+        if filter_query:
+            params["$filter"] = filter_query
+        if select:
+            params["$select"] = select
+        if orderby:
+            params["$orderby"] = orderby
+        return params
+
+    def get_messages(
+        self,
+        folder: str = "inbox",
+        top: int = 50,
+        filter_query: Optional[str] = None,
+        select: Optional[str] = MESSAGE_SELECT,
+        orderby: Optional[str] = None
+    ) -> list:
         """
         获取邮件列表
 
         Args:
             folder: 文件夹名称 (inbox, sentItems, drafts等)
             top: 返回数量
+            filter_query: 服务端过滤条件 ($filter)
+            select: 返回字段 ($select)，None 表示返回全部字段
+            orderby: 排序 ($orderby)，注意排序字段需出现在 $filter 开头
         """
-        if not self.access_token:
-            self.get_access_token()
+        self.ensure_token()
 
-        res = requests.get(
+        res = self.session.get(
             f"https://graph.microsoft.com/v1.0/me/mailFolders/{folder}/messages",
-            headers={"Authorization": f"Bearer {self.access_token}"},
-            params={"$top": top}
+            params=self._build_query(top, filter_query, select, orderby)
         )
 
         if res.status_code != 200:
@@ -54,13 +139,43 @@ class OutlookGraphEmailHandler:
 
         return res.json().get("value", [])
 
-    def get_messages_from_multiple_folders(self, folders: list = None, top: int = 50) -> list:
+    def get_message(self, message_id: str, select: Optional[str] = MESSAGE_SELECT) -> Dict:
+        """
+        获取单封邮件
+
+        Args:
+            message_id: 邮件 ID
+            select: 返回字段 ($select)，None 表示返回全部字段
+        """
+        self.ensure_token()
+
+        res = self.session.get(
+            f"https://graph.microsoft.com/v1.0/me/messages/{message_id}",
+            params={"$select": select} if select else None
+        )
+
+        if res.status_code != 200:
+            raise Exception(f"获取邮件失败 (状态码 {res.status_code}): {res.text}")
+
+        return res.json()
+
+    def get_messages_from_multiple_folders(
+        self,
+        folders: list = None,
+        top: int = 50,
+        filter_query: Optional[str] = None,
+        select: Optional[str] = MESSAGE_SELECT,
+        orderby: Optional[str] = None
+    ) -> list:
         """
         从多个文件夹获取邮件
 
         Args:
             folders: 文件夹名称列表，默认检查 inbox 和 junkemail
             top: 每个文件夹返回的邮件数量
+            filter_query: 服务端过滤条件 ($filter)
+            select: 返回字段 ($select)，None 表示返回全部字段
+            orderby: 排序 ($orderby)
 
         Returns:
             所有文件夹的邮件列表
@@ -68,14 +183,37 @@ class OutlookGraphEmailHandler:
         if folders is None:
             folders = ["inbox", "junkemail"]
 
+        self.ensure_token()
+
+        query = urlencode(self._build_query(top, filter_query, select, orderby), quote_via=quote, safe="$,/'")
+
+        # 通过 JSON $batch 在一次请求中获取所有文件夹（单次最多 20 个子请求）
+        res = self.session.post(
+            "https://graph.microsoft.com/v1.0/$batch",
+            json={
+                "requests": [
+                    {
+                        "id": str(i),
+                        "method": "GET",
+                        "url": f"/me/mailFolders/{folder}/messages?{query}"
+                    }
+                    for i, folder in enumerate(folders, 1)
+                ]
+            }
+        )
+
+        if res.status_code != 200:
+            raise Exception(f"批量获取邮件失败 (状态码 {res.status_code}): {res.text}")
+
+        # 按文件夹顺序合并结果
+        responses = sorted(res.json().get("responses", []), key=lambda r: int(r.get("id", 0)))
+
         all_messages = []
-        for folder in folders:
-            try:
-                messages = self.get_messages(folder=folder, top=top)
-                all_messages.extend(messages)
-            except Exception as e:
-                # 某些文件夹可能不存在，忽略错误继续
-                pass
+        for response in responses:
+            # 某些文件夹可能不存在，忽略失败的子请求继续
+            if response.get("status") != 200:
+                continue
+            all_messages.extend((response.get("body") or {}).get("value", []))
 
         return all_messages
 
@@ -106,7 +244,11 @@ class OutlookGraphEmailHandler:
 
         while time.time() - start_time < timeout:
             try:
-                messages = self.get_messages(top=20)
+                # 先只取摘要字段筛选，命中后再单独获取正文
+                messages = self.get_messages(top=20, select=MESSAGE_SUMMARY_SELECT)
+
+                # ISO-8601 UTC 时间字符串可直接按字典序比较，每轮只计算一次截止时间
+                cutoff_iso = (datetime.now(timezone.utc) - timedelta(minutes=10)).strftime('%Y-%m-%dT%H:%M:%SZ')
 
                 for msg in messages:
                     from_addr = msg.get('from', {}).get('emailAddress', {}).get('address', '')
@@ -123,14 +265,11 @@ class OutlookGraphEmailHandler:
                             continue
 
                     # 检查时间（只看最近10分钟的邮件）
-                    try:
-                        msg_time = datetime.fromisoformat(received_time.replace('Z', '+00:00'))
-                        if datetime.now(msg_time.tzinfo) - msg_time > timedelta(minutes=10):
-                            continue
-                    except:
-                        pass
+                    if received_time and received_time < cutoff_iso:
+                        continue
 
                     # 找到了！
+                    msg = self.get_message(msg.get('id'))
                     print(f"\n✅ 找到验证邮件！")
                     print(f"  主题: {subject}")
                     print(f"  发件人: {from_addr}")
@@ -160,29 +299,15 @@ class OutlookGraphEmailHandler:
 
     def extract_verification_link(self, email_data: Dict) -> Optional[str]:
         """从邮件中提取验证链接"""
-        import re
-
         # 先尝试从HTML body提取
         body_html = email_data.get('body_html', '')
         body_preview = email_data.get('body_preview', '')
 
-        # 常见验证链接模式
-        patterns = [
-            r'https://www\.ohmygpt\.com/[^\s"<>]+',
-            r'https://ohmygpt\.com/[^\s"<>]+',
-            r'http[s]?://[^\s"<>]+verify[^\s"<>]*',
-        ]
-
-        for pattern in patterns:
-            # 先从HTML提取
-            matches = re.findall(pattern, body_html)
-            if matches:
-                return matches[0]
-
-            # 再从preview提取
-            matches = re.findall(pattern, body_preview)
-            if matches:
-                return matches[0]
+        for pattern in _VERIFY_PATTERNS:
+            # 先从HTML提取，再从preview提取
+            match = pattern.search(body_html) or pattern.search(body_preview)
+            if match:
+                return match.group(0)
 
         return None
 
@@ -7,17 +7,71 @@ import sys
 import time
 import re
 import json
-from datetime import datetime
-from playwright.sync_api import sync_playwright
+import itertools
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from playwright.sync_api import sync_playwright, Browser, BrowserContext
 
 from email_handler_graph import OutlookGraphEmailHandler
 
+# 验证邮件发件人
+VERIFICATION_SENDER = "noreply@dogeworks.com"
+
+# 邮件中的 magic link
+_MAGIC_LINK_RE = re.compile(r'https://verified\.ohmycdn\.com/auth/v1/magic-link/[^\s"<>]+')
+
+# 返回第一个文本形如 A1 的圆形div中的安全验证码，没有则返回 null
+_FIND_SECURITY_CODE_JS = """() => {
+    for (const d of document.querySelectorAll('div.rounded-full')) {
+        const t = d.innerText.trim();
+        if (/^[A-Z]\\d$/.test(t)) return t;
+    }
+    return null;
+}"""
+
+# 点击Continue后的等待验证页面是否已渲染：出现安全验证提示、"查收邮件"提示，或邮箱输入框已消失
+_POST_CONTINUE_VIEW_JS = """() => /Security Answer|安全验证|check your (email|inbox)/i.test(document.body.innerText)
+    || !document.querySelector('input[type="email"]')"""
+
+# 返回文本等于安全验证码的label序号，没有则返回 -1
+_FIND_LABEL_INDEX_JS = """(code) => Array.from(document.querySelectorAll('label'))
+    .findIndex(l => l.innerText.trim() === code)"""
+
+# Outlook账号记录（账号文件每行格式: email----password----client_id----refresh_token）
+Account = collections.namedtuple('Account', 'email password client_id refresh_token raw')
+
+# 自动化流程只操作表单控件，不需要加载的资源：图片、字体、媒体和统计脚本（保留CSS，部分点击依赖布局）
+# 只按 URL 注册这些路由，其余请求不经过 Python 回调（同步 API 的回调只在调用 Playwright 时才会执行）
+_BLOCKED_URL_RE = re.compile(
+    r"\.(?:png|jpe?g|gif|webp|avif|svg|ico|woff2?|ttf|otf|eot|mp4|webm|mp3|ogg)(?:[?#]|$)"
+    r"|google-analytics\.com|googletagmanager\.com|doubleclick\.net",
+    re.IGNORECASE
+)
+
+
+def block_heavy_resources(context: BrowserContext):
+    """为浏览器上下文注册路由：中止图片、字体、媒体和统计脚本请求"""
+    context.route(_BLOCKED_URL_RE, lambda route: route.abort())
+
+
+# 并发注册时各线程的日志前缀（账号序号和邮箱），用于区分交错输出
+_log_context = threading.local()
+_print_lock = threading.Lock()
+
 
 def log(msg, verbose=True):
-    """条件输出日志"""
+    """条件输出日志（并发时每行带上当前线程正在处理的账号前缀）"""
     if verbose:
-        print(msg)
-        sys.stdout.flush()
+        msg = str(msg)
+        prefix = getattr(_log_context, 'prefix', None)
+        if prefix:
+            body = msg.lstrip('\n')
+            msg = '\n' * (len(msg) - len(body)) + '\n'.join(f"{prefix} {line}" for line in body.split('\n'))
+        with _print_lock:
+            print(msg)
+            sys.stdout.flush()
 
 
 def load_config(config_file="config.json"):
@@ -32,12 +86,14 @@ def load_config(config_file="config.json"):
             "account_file": "宝贝信息-954251120002437504.txt",
             "headless": False,
             "max_accounts": None,
-            "delay_between_accounts": 5
+            "delay_between_accounts": 5,
+            "concurrency": 1
         }
 
 
 def register_single_account(
-    outlook_account_line: str,
+    account: Account,
+    context: BrowserContext,
     referral_url: str,
     headless: bool = True,
     verbose: bool = True
@@ -46,7 +102,8 @@ def register_single_account(
     注册单个账号
 
     Args:
-        outlook_account_line: Outlook账号 (格式: email----password----client_id----refresh_token)
+        account: 已解析的Outlook账号
+        context: 浏览器上下文（由调用方创建和关闭）
         referral_url: 邀请链接
         headless: 是否无头模式
         verbose: 是否详细输出（无头模式下强制为True）
@@ -58,294 +115,436 @@ def register_single_account(
     if headless:
         verbose = True
 
-    parts = outlook_account_line.strip().split('----')
-    if len(parts) != 4:
-        return {"success": False, "error": "账号格式错误"}
-
-    email, password, client_id, refresh_token = parts
+    email, client_id, refresh_token = account.email, account.client_id, account.refresh_token
 
     log("="*70, verbose)
     log(f"开始注册: {email}", verbose)
     log("="*70, verbose)
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=headless)
-            context = browser.new_context(
-           viewport={'width': 1920, 'height': 1080}
-)
+        # ========== 步骤1: 访问邀请码注册页面 ==========
+        log(f"\n[1/6] 访问邀请页面: {referral_url}", verbose)
+        page = context.new_page()
 
-            # ========== 步骤1: 访问邀请码注册页面 ==========
-            log(f"\n[1/6] 访问邀请页面: {referral_url}", verbose)
-            page = context.new_page()
+        start_time = time.time()
+        page.goto(referral_url, wait_until="domcontentloaded", timeout=60000)
+        load_time = time.time() - start_time
 
-            start_time = time.time()
-            page.goto(referral_url, wait_until="domcontentloaded", timeout=60000)
-            load_time = time.time() - start_time
+        log(f"  页面加载完成 ({load_time:.1f}秒)", verbose)
+        log(f"  当前URL: {page.url}", verbose)
 
-            log(f"  页面加载完成 ({load_time:.1f}秒)", verbose)
-            log(f"  当前URL: {page.url}", verbose)
-
-            # ========== 步骤2: 勾选四个框并继续 ==========
-            log(f"\n[2/6] 勾选条款...", verbose)
+        # ========== 步骤2: 勾选四个框并继续 ==========
+        log(f"\n[2/6] 勾选条款...", verbose)
 
+        try:
+            # 等待复选框完全加载（增加等待时间）
+            log(f"  等待页面元素加载...", verbose)
+            page.wait_for_selector('button[role="checkbox"]', timeout=15000)
             try:
-                # 等待复选框完全加载（增加等待时间）
-                log(f"  等待页面元素加载...", verbose)
-                page.wait_for_selector('button[role="checkbox"]', timeout=15000)
-                time.sleep(4)  # 额外等待确保页面完全渲染
-
-                checkboxes = page.locator('button[role="checkbox"]').all()
-                log(f"  找到 {len(checkboxes)} 个复选框", verbose)
-
-                # 勾选所有checkbox（每个之间有延迟）
-                for i, checkbox in enumerate(checkboxes):
-                    checked_state = checkbox.get_attribute('aria-checked')
-                    log(f"  第 {i+1} 个复选框状态: {checked_state}", verbose)
-                    if checked_state == 'false':
-                        checkbox.click()
-                        time.sleep(0.3)  # 每次点击后等待
-                        log(f"  ✅ 已勾选第 {i+1} 个", verbose)
-
-                time.sleep(1.5)  # 等待按钮状态更新
-
-                # 等待并点击"Understood"按钮
-                try:
-                    page.wait_for_selector('button:has-text("Understood"):not([disabled])', timeout=3000)
-                    page.click('button:has-text("Understood")')
-                    log(f"  ✅ 已点击'Understood'", verbose)
-                except:
-                    log(f"  ⚠️  'Understood'按钮仍未可用，尝试强制点击", verbose)
-                    if page.locator('button:has-text("Understood")').count() > 0:
-                        page.click('button:has-text("Understood")', force=True)
-                        log(f"  ✅ 已强制点击'Understood'", verbose)
-
-                time.sleep(2)
-
-            except Exception as e:
-                log(f"  ⚠️  勾选复选框时出错: {e}", verbose)
-
-            # ========== 步骤3: 输入邮箱并发送验证邮件 ==========
-            log(f"\n[3/6] 输入邮箱: {email}", verbose)
+                # 等待四个复选框都渲染出来
+                page.wait_for_function(
+                    "document.querySelectorAll('button[role=checkbox]').length >= 4",
+                    timeout=5000
+                )
+            except:
+                pass
+
+            checkboxes = page.locator('button[role="checkbox"]').all()
+            log(f"  找到 {len(checkboxes)} 个复选框", verbose)
+
+            # 勾选所有checkbox
+            for i, checkbox in enumerate(checkboxes):
+                checked_state = checkbox.get_attribute('aria-checked')
+                log(f"  第 {i+1} 个复选框状态: {checked_state}", verbose)
+                if checked_state == 'false':
+                    checkbox.click()
+                    log(f"  ✅ 已勾选第 {i+1} 个", verbose)
 
             try:
-                # 查找并填写邮箱
-                page.fill('input[type="email"]', email)
-                log(f"  ✅ 已输入邮箱", verbose)
-
-                # 等待"继续"按钮变为可点击
-                log(f"  等待邮箱验证...", verbose)
-                page.wait_for_selector('button.w-full:has-text("Continue"):not([disabled])', timeout=15000)
+                # 等待所有复选框状态更新为已勾选
+                page.wait_for_function(
+                    "Array.from(document.querySelectorAll('button[role=checkbox]'))"
+                    ".every(b => b.getAttribute('aria-checked') === 'true')",
+                    timeout=3000
+                )
+            except:
+                pass
+
+            # 等待并点击"Understood"按钮
+            try:
+                page.wait_for_selector('button:has-text("Understood"):not([disabled])', timeout=3000)
+                page.click('button:has-text("Understood")')
+                log(f"  ✅ 已点击'Understood'", verbose)
+            except:
+                log(f"  ⚠️  'Understood'按钮仍未可用，尝试强制点击", verbose)
+                if page.locator('button:has-text("Understood")').count() > 0:
+                    page.click('button:has-text("Understood")', force=True)
+                    log(f"  ✅ 已强制点击'Understood'", verbose)
+
+            # 等待邮箱输入框出现
+            page.wait_for_selector('input[type="email"]', timeout=5000)
+
+        except Exception as e:
+            log(f"  ⚠️  勾选复选框时出错: {e}", verbose)
+
+        # ========== 步骤3: 输入邮箱并发送验证邮件 ==========
+        log(f"\n[3/6] 输入邮箱: {email}", verbose)
+
+        try:
+            # 查找并填写邮箱
+            page.fill('input[type="email"]', email)
+            log(f"  ✅ 已输入邮箱", verbose)
+
+            # 等待"继续"按钮变为可点击
+            log(f"  等待邮箱验证...", verbose)
+            page.wait_for_selector('button.w-full:has-text("Continue"):not([disabled])', timeout=15000)
+
+            email_sent_time = time.time()
+            page.click('button.w-full:has-text("Continue")')
+            log(f"  ✅ 已发送验证邮件", verbose)
+            try:
+                # 单页应用点击后不会加载新文档，等待页面切换到等待验证视图（有无安全验证都会立即返回）
+                page.wait_for_function(_POST_CONTINUE_VIEW_JS, timeout=5000)
+            except:
+                pass
 
-                email_sent_time = time.time()
-                page.click('button.w-full:has-text("Continue")')
-                log(f"  ✅ 已发送验证邮件", verbose)
-                time.sleep(3)
+            # ========== 读取等待验证页面上的安全验证码 ==========
+            security_code = None
+            try:
+                # 检查页面是否显示"安全答案"
+                if page.locator('text=Security Answer').count() > 0 or page.locator('text=安全验证').count() > 0:
+                    log(f"  🔐 检测到安全验证提示", verbose)
+                    try:
+                        # 只有出现安全验证提示时才等待验证码渲染
+                        page.wait_for_function(_FIND_SECURITY_CODE_JS, timeout=5000)
+                    except:
+                        pass
+
+                    # 在浏览器内一次性查找显示安全验证码的圆形div（格式如 A1, B6, C8）
+                    security_code = page.evaluate(_FIND_SECURITY_CODE_JS)
+                    if security_code:
+                        log(f"  🔐 从等待页面读取到安全验证码: {security_code}", verbose)
+            except Exception as e:
+                log(f"  ℹ️  读取安全验证码时出错（可能没有安全验证）: {e}", verbose)
 
-                # ========== 读取等待验证页面上的安全验证码 ==========
-                security_code = None
-                try:
-                    # 检查页面是否显示"安全答案"
-                    if page.locator('text=Security Answer').count() > 0 or page.locator('text=安全验证').count() > 0:
-                        log(f"  🔐 检测到安全验证提示", verbose)
+        except Exception as e:
+            return {"success": False, "error": f"发送验证邮件失败: {e}"}
 
-                        # 查找显示安全验证码的圆形div
-                        code_divs = page.locator('div.rounded-full').all()
-                        for div in code_divs:
-                            try:
-                                text = div.inner_text().strip()
-                                # 匹配格式如 A1, B6, C8
-                                if re.match(r'^[A-Z]\d$', text):
-                                    security_code = text
-                                    log(f"  🔐 从等待页面读取到安全验证码: {security_code}", verbose)
-                                    break
-                            except:
-                                continue
-                except Exception as e:
-                    log(f"  ℹ️  读取安全验证码时出错（可能没有安全验证）: {e}", verbose)
+        # ========== 步骤4: 等待并读取验证邮件 (20秒超时) ==========
+        log(f"\n[4/6] 等待验证邮件 (检查 inbox 和 junkemail)...", verbose)
 
+        # 轮询结束后关闭 Graph 会话，并发时不会堆积连接池
+        with OutlookGraphEmailHandler(email, client_id, refresh_token) as email_handler:
+            # 轮询前确保 token 可用：未过期的缓存 token 直接复用（不发请求），
+            # refresh_token 失效时立即失败，不再重复打开浏览器和发送验证邮件
+            try:
+                email_handler.ensure_token()
             except Exception as e:
-                browser.close()
-                return {"success": False, "error": f"发送验证邮件失败: {e}"}
-
-            # ========== 步骤4: 等待并读取验证邮件 (20秒超时) ==========
-            log(f"\n[4/6] 等待验证邮件 (检查 inbox 和 junkemail)...", verbose)
-
-            email_handler = OutlookGraphEmailHandler(email, client_id, refresh_token)
-            email_handler.get_access_token()
+                return {"success": False, "error": f"获取邮箱访问令牌失败: {e}"}
 
             verification_email = None
             max_wait_time = 20  # 最大等待20秒
-            check_interval = 3  # 每3秒检查一次
+            check_interval = 1  # 首次1秒后检查，之后按1.5倍递增（最多8秒）
+
+            # 在服务端按时间和发件人过滤，只返回发送验证邮件之后收到的邮件
+            sent_iso = datetime.fromtimestamp(email_sent_time - 1, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            filter_query = (
+                f"receivedDateTime ge {sent_iso} and "
+                f"from/emailAddress/address eq '{VERIFICATION_SENDER}'"
+            )
 
-            for i in range(int(max_wait_time / check_interval)):
+            wait_start = time.time()
+            while True:
                 try:
                     # 从多个文件夹获取邮件
                     messages = email_handler.get_messages_from_multiple_folders(
                         folders=["inbox", "junkemail"],
-                        top=5
+                        top=5,
+                        filter_query=filter_query,
+                        orderby="receivedDateTime desc"
                     )
 
                     for msg in messages:
-                        from_addr = msg.get('from', {}).get('emailAddress', {}).get('address', '')
-                        if 'dogeworks.com' not in from_addr.lower():
+                        fae = (msg.get('from') or {}).get('emailAddress') or {}
+                        from_addr = fae.get('address') or ''
+                        if not from_addr or 'dogeworks.com' not in from_addr.lower():
                             continue
 
                         subject = msg.get('subject', '')
                         if 'OhMyGPT' not in subject:
                             continue
 
-                        received_time = msg.get('receivedDateTime', '')
-                        try:
-                            msg_time = datetime.fromisoformat(received_time.replace('Z', '+00:00'))
-                            if msg_time.timestamp() >= email_sent_time - 1:
-                                wait_time = time.time() - email_sent_time
-                                log(f"  ✅ 收到邮件 ({wait_time:.1f}秒)", verbose)
-                                verification_email = msg
-                                break
-                        except:
-                            pass
+                        # ISO-8601 UTC 时间字符串可直接与 sent_iso 按字典序比较
+                        if msg.get('receivedDateTime', '') >= sent_iso:
+                            wait_time = time.time() - email_sent_time
+                            log(f"  ✅ 收到邮件 ({wait_time:.1f}秒)", verbose)
+                            verification_email = msg
+                            break
 
                     if verification_email:
                         break
 
-                    elapsed = (i + 1) * check_interval
-                    log(f"  等待中... {elapsed}s / {max_wait_time}s", verbose)
-                    time.sleep(check_interval)
-
                 except Exception as e:
                     if verbose:
                         log(f"  检查邮件出错: {e}", verbose)
-                    time.sleep(check_interval)
-
-            if not verification_email:
-                log(f"  ⚠️  超过 {max_wait_time} 秒未收到验证邮件，关闭浏览器准备重试", verbose)
-                browser.close()
-                return {"success": False, "error": "超时未收到验证邮件", "should_retry": True}
 
-            # ========== 步骤5: 提取并在新标签页打开 magic link ==========
-            log(f"\n[5/6] 提取magic link...", verbose)
+                elapsed = time.time() - wait_start
+                if elapsed >= max_wait_time:
+                    break
 
-            body_html = verification_email.get('body', {}).get('content', '')
-            match = re.search(r'https://verified\.ohmycdn\.com/auth/v1/magic-link/[^\s"<>]+', body_html)
+                log(f"  等待中... {elapsed:.0f}s / {max_wait_time}s", verbose)
+                # 用 page.wait_for_timeout 代替 time.sleep，等待期间页面的请求和路由回调仍会被处理
+                page.wait_for_timeout(min(check_interval, max_wait_time - elapsed) * 1000)
+                check_interval = min(check_interval * 1.5, 8)
 
-            if not match:
-                browser.close()
-                return {"success": False, "error": "未找到magic link"}
+        if not verification_email:
+            log(f"  ⚠️  超过 {max_wait_time} 秒未收到验证邮件，准备重试", verbose)
+            return {"success": False, "error": "超时未收到验证邮件", "should_retry": True}
 
-            magic_link = match.group(0)
-            if verbose:
-                log(f"  Magic link: {magic_link[:60]}...", verbose)
+        # ========== 步骤5: 提取并打开 magic link ==========
+        log(f"\n[5/6] 提取magic link...", verbose)
 
-            # 在新标签页打开magic link
-            log(f"\n[6/6] 打开magic link并授权...", verbose)
-            magic_page = context.new_page()
-            magic_page.goto(magic_link, wait_until="domcontentloaded", timeout=30000)
-            time.sleep(1)
+        body_html = verification_email.get('body', {}).get('content', '')
+        match = _MAGIC_LINK_RE.search(body_html)
 
-            # 检查是否有安全验证（Security Verification）
-            try:
-                # 检查页面是否包含 "Security Verification"
-                if magic_page.locator('text=Security Verification').count() > 0:
-                    log(f"  🔐 检测到安全验证页面", verbose)
+        if not match:
+            return {"success": False, "error": "未找到magic link"}
 
-                    if security_code:
-                        log(f"  🔐 尝试点击安全选项: {security_code}", verbose)
-                        # 查找并点击对应的安全选项（如 A1, B6, C8）
+        magic_link = match.group(0)
+        if verbose:
+            log(f"  Magic link: {magic_link[:60]}...", verbose)
+
+        # 邀请页面已不再需要，直接在当前页面打开magic link
+        log(f"\n[6/6] 打开magic link并授权...", verbose)
+        page.goto(magic_link, wait_until="domcontentloaded", timeout=30000)
+        magic_page = page
+        magic_page.wait_for_timeout(1000)
+
+        # 检查是否有安全验证（Security Verification）
+        try:
+            # 检查页面是否包含 "Security Verification"
+            if magic_page.locator('text=Security Verification').count() > 0:
+                log(f"  🔐 检测到安全验证页面", verbose)
+
+                if security_code:
+                    log(f"  🔐 尝试点击安全选项: {security_code}", verbose)
+                    # 查找并点击对应的安全选项（如 A1, B6, C8）
+                    try:
+                        # 等待选项加载
+                        magic_page.wait_for_selector('input[type="radio"][name="answer"]', timeout=5000)
+                        magic_page.wait_for_timeout(1000)
+
+                        # 使用aria-label查找对应的label并点击
+                        clicked = False
                         try:
-                            # 等待选项加载
-                            magic_page.wait_for_selector('input[type="radio"][name="answer"]', timeout=5000)
-                            time.sleep(1)
+                            # 方法1: 通过aria-label精确匹配
+                            label_selector = f'label:has(input[aria-label="Security option {security_code}"])'
+                            if magic_page.locator(label_selector).count() > 0:
+                                magic_page.click(label_selector)
+                                log(f"  ✅ 已点击安全选项: {security_code}", verbose)
+                                clicked = True
+                                magic_page.wait_for_timeout(1000)
+                        except:
+                            pass
 
-                            # 使用aria-label查找对应的label并点击
-                            clicked = False
+                        # 方法2: 通过value查找input再点击父label
+                        if not clicked:
                             try:
-                                # 方法1: 通过aria-label精确匹配
-                                label_selector = f'label:has(input[aria-label="Security option {security_code}"])'
-                                if magic_page.locator(label_selector).count() > 0:
+                                input_selector = f'input[type="radio"][value="{security_code}"]'
+                                if magic_page.locator(input_selector).count() > 0:
+                                    # 点击包含该input的label
+                                    label_selector = f'label:has(input[value="{security_code}"])'
                                     magic_page.click(label_selector)
-                                    log(f"  ✅ 已点击安全选项: {security_code}", verbose)
+                                    log(f"  ✅ 已点击安全选项: {security_code} (方法2)", verbose)
                                     clicked = True
-                                    time.sleep(1)
+                                    magic_page.wait_for_timeout(1000)
                             except:
                                 pass
 
-                            # 方法2: 通过value查找input再点击父label
-                            if not clicked:
-                                try:
-                                    input_selector = f'input[type="radio"][value="{security_code}"]'
-                                    if magic_page.locator(input_selector).count() > 0:
-                                        # 点击包含该input的label
-                                        label_selector = f'label:has(input[value="{security_code}"])'
-                                        magic_page.click(label_selector)
-                                        log(f"  ✅ 已点击安全选项: {security_code} (方法2)", verbose)
-                                        clicked = True
-                                        time.sleep(1)
-                                except:
-                                    pass
-
-                            # 方法3: 遍历所有label查找包含安全码的文本
-                            if not clicked:
-                                try:
-                                    labels = magic_page.locator('label').all()
-                                    log(f"  找到 {len(labels)} 个选项，遍历查找...", verbose)
-
-                                    for label in labels:
-                                        try:
-                                            text = label.inner_text().strip()
-                                            if text == security_code:
-                                                label.click()
-                                                log(f"  ✅ 已点击安全选项: {security_code} (方法3)", verbose)
-                                                clicked = True
-                                                time.sleep(1)
-                                                break
-                                        except:
-                                            continue
-                                except:
-                                    pass
-
-                            if not clicked:
-                                log(f"  ⚠️  未找到匹配的安全选项: {security_code}", verbose)
-
-                        except Exception as e:
-                            log(f"  ⚠️  处理安全验证失败: {e}", verbose)
-                    else:
-                        log(f"  ⚠️  未从邮件中提取到安全验证码，可能需要手动处理", verbose)
-            except Exception as e:
-                log(f"  ℹ️  未检测到安全验证或检测出错: {e}", verbose)
-
-            # 点击 "Approve Login" 按钮
-            try:
-                magic_page.wait_for_selector('button:has-text("Approve Login")', timeout=5000)
-                magic_page.click('button:has-text("Approve Login")')
-                log(f"  ✅ 已点击'Approve Login'", verbose)
-            except Exception as e:
-                log(f"  ⚠️  点击按钮时出错: {e}", verbose)
-
-            # ========== 等待5秒后直接关闭 ==========
-            log(f"\n[完成] 等待5秒后关闭浏览器...", verbose)
-            time.sleep(5)
+                        # 方法3: 遍历所有label查找包含安全码的文本
+                        if not clicked:
+                            try:
+                                # 在浏览器内一次性查找文本匹配的label序号
+                                index = magic_page.evaluate(_FIND_LABEL_INDEX_JS, security_code)
+                                if index >= 0:
+                                    magic_page.locator('label').nth(index).click()
+                                    log(f"  ✅ 已点击安全选项: {security_code} (方法3)", verbose)
+                                    clicked = True
+                                    magic_page.wait_for_timeout(1000)
+                            except:
+                                pass
 
-            # 关闭浏览器
-            browser.close()
+                        if not clicked:
+                            log(f"  ⚠️  未找到匹配的安全选项: {security_code}", verbose)
 
-            log(f"\n{'='*70}", verbose)
-            log(f"✅ 注册成功: {email}", verbose)
-            log(f"{'='*70}", verbose)
-            return {
-                "success": True,
-                "email": email,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            }
+                    except Exception as e:
+                        log(f"  ⚠️  处理安全验证失败: {e}", verbose)
+                else:
+                    log(f"  ⚠️  未从邮件中提取到安全验证码，可能需要手动处理", verbose)
+        except Exception as e:
+            log(f"  ℹ️  未检测到安全验证或检测出错: {e}", verbose)
+
+        # 点击 "Approve Login" 按钮
+        try:
+            magic_page.wait_for_selector('button:has-text("Approve Login")', timeout=5000)
+            magic_page.click('button:has-text("Approve Login")')
+            log(f"  ✅ 已点击'Approve Login'", verbose)
+        except Exception as e:
+            log(f"  ⚠️  点击按钮时出错: {e}", verbose)
+
+        # ========== 等待5秒后直接关闭 ==========
+        log(f"\n[完成] 等待5秒后关闭页面...", verbose)
+        magic_page.wait_for_timeout(5000)
+
+        log(f"\n{'='*70}", verbose)
+        log(f"✅ 注册成功: {email}", verbose)
+        log(f"{'='*70}", verbose)
+        return {
+            "success": True,
+            "email": email,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
 
     except Exception as e:
         log(f"\n❌ 注册失败: {e}", verbose)
         if verbose:
             import traceback
-            traceback.print_exc()
+            # 经 log 输出，并发时堆栈也带账号前缀且不与其他线程的输出交错
+            log(traceback.format_exc().rstrip('\n'), verbose)
         return {"success": False, "error": str(e)}
 
 
+def parse_accounts(lines, verbose: bool = False):
+    """
+    解析账号行，跳过空行和格式错误的行
+
+    Args:
+        lines: 账号行的可迭代对象
+        verbose: 是否输出格式错误的行
+
+    Yields:
+        Account 记录
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if len(parts := line.split('----')) != 4:
+            log(f"⚠️  账号格式错误，已跳过: {parts[0]}", verbose)
+            continue
+        yield Account(*parts, raw=line)
+
+
+def iter_accounts(account_file: str, limit: int = None, verbose: bool = False):
+    """
+    逐行读取并解析账号文件
+
+    Args:
+        account_file: 账号文件路径
+        limit: 最多读取的账号数（None 表示全部）
+        verbose: 是否输出格式错误的行
+
+    Yields:
+        Account 记录
+    """
+    with open(account_file, 'r', encoding='utf-8') as f:
+        accounts = parse_accounts(f, verbose)
+        yield from (itertools.islice(accounts, limit) if limit else accounts)
+
+
+def load_done_emails(results_file: str) -> set:
+    """
+    读取逐条结果文件 (JSONL)，返回已注册成功的邮箱
+
+    Args:
+        results_file: 结果文件路径，不存在时视为空
+
+    Returns:
+        成功账号的邮箱集合
+    """
+    done = set()
+    try:
+        with open(results_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时可能留下半行，忽略
+                    continue
+                if record.get('success'):
+                    done.add(record.get('email'))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def register_with_retry(
+    account: Account,
+    browser: Browser,
+    index: int,
+    referral_url: str,
+    headless: bool,
+    delay: float,
+    max_retries: int = 3
+) -> dict:
+    """
+    注册单个账号，超时未收到邮件时自动重试
+
+    Args:
+        account: 已解析的Outlook账号
+        browser: 复用的浏览器实例，每次尝试使用独立的上下文
+        index: 账号序号（用于日志）
+        referral_url: 邀请链接
+        headless: 是否无头模式
+        delay: 重试前等待时间（秒）
+        max_retries: 最多尝试次数
+
+    Returns:
+        最后一次注册的结果字典
+    """
+    for retry in range(max_retries):
+        if retry > 0:
+            log(f"\n🔄 第 {index} 个账号第 {retry + 1} 次尝试...")
+
+        try:
+            context = browser.new_context(
+                viewport={'width': 1920, 'height': 1080}
+            )
+            block_heavy_resources(context)
+        except Exception as e:
+            # 浏览器已崩溃或断开，重试也无意义，交给调用方重新启动浏览器
+            log(f"\n❌ 第 {index} 个账号创建浏览器上下文失败: {e}")
+            return {"success": False, "error": f"创建浏览器上下文失败: {e}"}
+
+        try:
+            result = register_single_account(
+                account,
+                context,
+                referral_url=referral_url,
+                headless=headless,
+                verbose=True
+            )
+        finally:
+            try:
+                context.close()
+            except Exception:
+                pass
+
+        if result.get('success'):
+            log(f"\n✅ 第 {index} 个账号注册成功!")
+            return result
+
+        # 如果是超时错误且标记为应该重试，则继续重试
+        if result.get('should_retry') and retry < max_retries - 1:
+            log(f"\n⚠️  超时未收到邮件，{delay}秒后重试...")
+            time.sleep(delay)
+            continue
+
+        # 其他错误或已达最大重试次数
+        log(f"\n❌ 第 {index} 个账号注册失败: {result.get('error')}")
+        return result
+
+
 def batch_register(config_file="config.json"):
     """批量注册"""
 
@@ -357,6 +556,8 @@ def batch_register(config_file="config.json"):
     headless = config.get("headless", False)
     max_accounts = config.get("max_accounts")
     delay = config.get("delay_between_accounts", 5)
+    concurrency = config.get("concurrency", 1)
+    results_file = config.get("results_file", "registration_results.jsonl")
 
     # 从URL提取邀请码
     referral_code = referral_url.split('/')[-1] if '/' in referral_url else "未知"
@@ -368,73 +569,124 @@ def batch_register(config_file="config.json"):
     log(f"邀请码: {referral_code}")
     log(f"账号文件: {account_file}")
     log(f"无头模式: {headless}")
+    log(f"并发数: {concurrency}")
     if max_accounts:
         log(f"最大注册数: {max_accounts}")
     log("")
 
-    # 读取账号
+    # 统计账号数（逐行扫描，不把整个文件读入内存）
     try:
-        with open(account_file, 'r', encoding='utf-8') as f:
-            accounts = [line.strip() for line in f if line.strip()]
+        total = sum(1 for _ in iter_accounts(account_file, max_accounts, verbose=True))
     except FileNotFoundError:
         log(f"❌ 账号文件 {account_file} 不存在")
         return
 
-    if max_accounts:
-        accounts = accounts[:max_accounts]
+    log(f"共 {total} 个账号待注册\n")
 
-    log(f"共 {len(accounts)} 个账号待注册\n")
+    # 之前已成功注册的账号直接跳过，中断后可续跑
+    done = load_done_emails(results_file)
+    if done:
+        log(f"已有 {len(done)} 个账号在 {results_file} 中记录为成功，将跳过\n")
 
     results = {"success": [], "failed": []}
+    results_lock = threading.Lock()
     start_time = time.time()
 
-    for i, account_line in enumerate(accounts, 1):
-        log(f"\n{'='*70}")
-        log(f"进度: {i}/{len(accounts)}")
-        log(f"{'='*70}")
-
-        # 最多重试3次
-        max_retries = 3
-        success = False
-
-        for retry in range(max_retries):
-            if retry > 0:
-                log(f"\n🔄 第 {retry + 1} 次尝试...")
+    # 各线程共享同一个账号迭代器，按需读取
+    pending = enumerate(iter_accounts(account_file, max_accounts), 1)
+    pending_lock = threading.Lock()
 
-            result = register_single_account(
-                account_line,
-                referral_url=referral_url,
-                headless=headless,
-                verbose=True
-            )
+    def worker(workers: int, results_fp):
+        """
+        每个工作线程启动一个浏览器，依次领取并注册账号，直到账号读取完毕
 
-            if result.get('success'):
-                results["success"].append({
-                    "email": result.get('email'),
-                    "timestamp": result.get('timestamp')
-                })
-                log(f"\n✅ 第 {i} 个账号注册成功!")
-                success = True
-                break
-            else:
-                # 如果是超时错误且标记为应该重试，则继续重试
-                if result.get('should_retry') and retry < max_retries - 1:
-                    log(f"\n⚠️  超时未收到邮件，{delay}秒后重试...")
-                    time.sleep(delay)
-                    continue
-                else:
-                    # 其他错误或已达最大重试次数
-                    results["failed"].append({
-                        "account": account_line.split('----')[0],
-                        "error": result.get('error')
-                    })
-                    log(f"\n❌ 第 {i} 个账号注册失败: {result.get('error')}")
-                    break
+        Args:
+            workers: 工作线程总数（多于1个时日志行带账号前缀）
+            results_fp: 追加写入每个账号结果的文件对象
+        """
+        with sync_playwright() as p:
+            browser = None
+            try:
+                while True:
+                    with pending_lock:
+                        item = next(pending, None)
+                    if item is None:
+                        return
+
+                    i, account = item
+                    email = account.email
+                    if workers > 1:
+                        _log_context.prefix = f"[#{i} {email}]"
+                    if email in done:
+                        log(f"\n⏭️  第 {i} 个账号已注册成功，跳过: {email}")
+                        continue
+
+                    log(f"\n{'='*70}")
+                    log(f"进度: {i}/{total}")
+                    log(f"{'='*70}")
+
+                    # 浏览器尚未启动或已崩溃时重新启动，失败计入当前账号
+                    if browser is None or not browser.is_connected():
+                        try:
+                            browser = p.chromium.launch(headless=headless)
+                        except Exception as e:
+                            browser = None
+                            log(f"\n❌ 启动浏览器失败: {e}")
 
-        # 延迟避免频率限制
-        if i < len(accounts):
-            log(f"\n等待 {delay} 秒后继续...")
-            time.sleep(delay)
+                    if browser is None:
+                        result = {"success": False, "error": "启动浏览器失败"}
+                    else:
+                        result = register_with_retry(
+                            account,
+                            browser,
+                            index=i,
+                            referral_url=referral_url,
+                            headless=headless,
+                            delay=delay
+                        )
+
+                    with results_lock:
+                        if result.get('success'):
+                            results["success"].append({
+                                "email": result.get('email'),
+                                "timestamp": result.get('timestamp')
+                            })
+                        else:
+                            results["failed"].append({
+                                "account": email,
+                                "error": result.get('error')
+                            })
+
+                        # 每个账号完成后立即追加记录，防止中途崩溃丢失结果
+                        record = {
+                            "email": email,
+                            "success": bool(result.get('success')),
+                            "timestamp": result.get('timestamp') or time.strftime("%Y-%m-%d %H:%M:%S"),
+                        }
+                        if not result.get('success'):
+                            record["error"] = result.get('error')
+                        results_fp.write(json.dumps(record, ensure_ascii=False) + '\n')
+                        results_fp.flush()
+
+                    # 延迟避免频率限制
+                    if i < total:
+                        log(f"\n等待 {delay} 秒后继续...")
+                        time.sleep(delay)
+            finally:
+                if browser is not None and browser.is_connected():
+                    browser.close()
+
+    # 多个账号相互独立，按并发数同时注册（每个线程复用自己的浏览器，每个账号使用独立上下文）
+    workers = max(1, min(concurrency, total))
+    with open(results_file, 'a', encoding='utf-8') as results_fp:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker, workers, results_fp) for _ in range(workers)]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    # 单个工作线程异常退出时仍然输出总结并保存已有结果
+                    log(f"\n❌ 工作线程异常退出: {e}")
 
     # 总结
     total_time = time.time() - start_time
@@ -462,6 +714,7 @@ def batch_register(config_file="config.json"):
         json.dump(results, f, indent=2, ensure_ascii=False)
 
     log(f"\n结果已保存到: {output_file}")
+    log(f"逐条记录见: {results_file}")
 
     return results
 
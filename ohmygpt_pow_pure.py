@@ -7,12 +7,743 @@ OhMyGPT PoW 求解器 - 纯 Python 实现
 3. POST /redeem 获取最终 powt token
 """
 
+import binascii
 import hashlib
+import multiprocessing
+import os
+import struct
 import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
 from typing import List, Tuple, Optional, Dict
 import time
 
+# 可选依赖: 安装 numba 后使用 JIT 编译的 SHA-256 内核求解，否则回退到 hashlib
+try:
+    import numpy as np
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+_sha256 = hashlib.sha256
+
+
+if HAS_NUMBA:
+    # SHA-256 初始哈希值和轮常量
+    _SHA256_IV = np.array([
+        0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a,
+        0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+    ], dtype=np.uint32)
+
+    _SHA256_K = np.array([
+        0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+        0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+        0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+        0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+        0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+        0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+        0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+        0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+    ], dtype=np.uint32)
+
+    @njit(cache=True, nogil=True, inline='always')
+    def _rotr(x, n):
+        return np.uint32((x >> np.uint32(n)) | (x << np.uint32(32 - n)))
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _sha256_compress(state, buf, offset, w):
+        """对 buf[offset:offset+64] 执行一次 SHA-256 压缩，原地更新 state (uint32[8])"""
+        # numba 会把 uint32 运算提升为 64 位，因此中间结果需显式截断回 uint32
+        for i in range(16):
+            j = offset + 4 * i
+            w[i] = (np.uint32(buf[j]) << np.uint32(24)) | (np.uint32(buf[j + 1]) << np.uint32(16)) | \
+                   (np.uint32(buf[j + 2]) << np.uint32(8)) | np.uint32(buf[j + 3])
+        for i in range(16, 64):
+            x = w[i - 15]
+            y = w[i - 2]
+            s0 = _rotr(x, 7) ^ _rotr(x, 18) ^ (x >> np.uint32(3))
+            s1 = _rotr(y, 17) ^ _rotr(y, 19) ^ (y >> np.uint32(10))
+            w[i] = w[i - 16] + s0 + w[i - 7] + s1
+
+        a, b, c, d = state[0], state[1], state[2], state[3]
+        e, f, g, h = state[4], state[5], state[6], state[7]
+        for i in range(64):
+            s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+            ch = np.uint32((e & f) ^ (~e & g))
+            t1 = np.uint32(h + s1 + ch + _SHA256_K[i] + w[i])
+            s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+            maj = (a & b) ^ (a & c) ^ (b & c)
+            t2 = np.uint32(s0 + maj)
+            h = g
+            g = f
+            f = e
+            e = np.uint32(d + t1)
+            d = c
+            c = b
+            b = a
+            a = np.uint32(t1 + t2)
+
+        state[0] += a
+        state[1] += b
+        state[2] += c
+        state[3] += d
+        state[4] += e
+        state[5] += f
+        state[6] += g
+        state[7] += h
+
+    # 多缓冲批量计算的通道数: 每批同时计算 64 个 nonce，SoA 布局便于 LLVM 生成 AVX2 向量指令
+    _LANES = 64
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _sha256_compress_lanes(state, bufs, offset, w, regs, t1):
+        """
+        多通道 SHA-256 压缩: 对每条通道 l 的 bufs[l, offset:offset+64] 执行一次压缩
+
+        state/regs 为 (8, lanes)，w 为 (64, lanes)，t1 为 (lanes,)，最内层循环遍历通道以便向量化
+        """
+        lanes = w.shape[1]
+        for i in range(16):
+            j = offset + 4 * i
+            for l in range(lanes):
+                w[i, l] = (np.uint32(bufs[l, j]) << np.uint32(24)) | (np.uint32(bufs[l, j + 1]) << np.uint32(16)) | \
+                          (np.uint32(bufs[l, j + 2]) << np.uint32(8)) | np.uint32(bufs[l, j + 3])
+        for i in range(16, 64):
+            for l in range(lanes):
+                x = w[i - 15, l]
+                y = w[i - 2, l]
+                s0 = _rotr(x, 7) ^ _rotr(x, 18) ^ (x >> np.uint32(3))
+                s1 = _rotr(y, 17) ^ _rotr(y, 19) ^ (y >> np.uint32(10))
+                w[i, l] = w[i - 16, l] + s0 + w[i - 7, l] + s1
+
+        regs[:, :] = state
+        a, b, c, d = regs[0], regs[1], regs[2], regs[3]
+        e, f, g, h = regs[4], regs[5], regs[6], regs[7]
+        for i in range(64):
+            k = _SHA256_K[i]
+            for l in range(lanes):
+                el = e[l]
+                s1 = _rotr(el, 6) ^ _rotr(el, 11) ^ _rotr(el, 25)
+                ch = np.uint32((el & f[l]) ^ (~el & g[l]))
+                t1[l] = np.uint32(h[l] + s1 + ch + k + w[i, l])
+            # 不搬移数据，只轮换行引用: h 所在行复用为新的 e，d 所在行复用为新的 a
+            new_e = h
+            for l in range(lanes):
+                new_e[l] = np.uint32(d[l] + t1[l])
+            new_a = d
+            for l in range(lanes):
+                al = a[l]
+                s0 = _rotr(al, 2) ^ _rotr(al, 13) ^ _rotr(al, 22)
+                maj = (al & b[l]) ^ (al & c[l]) ^ (b[l] & c[l])
+                new_a[l] = np.uint32(t1[l] + s0 + maj)
+            h = g
+            g = f
+            f = e
+            e = new_e
+            d = c
+            c = b
+            b = a
+            a = new_a
+
+        for l in range(lanes):
+            state[0, l] += a[l]
+            state[1, l] += b[l]
+            state[2, l] += c[l]
+            state[3, l] += d[l]
+            state[4, l] += e[l]
+            state[5, l] += f[l]
+            state[6, l] += g[l]
+            state[7, l] += h[l]
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _write_nonce(buf, offset, nonce, digits):
+        """把 nonce 的十进制 ASCII 写入 buf[offset:]，返回位数"""
+        n = nonce
+        n_digits = 0
+        while True:
+            digits[n_digits] = 48 + n % 10
+            n //= 10
+            n_digits += 1
+            if n == 0:
+                break
+        for k in range(n_digits):
+            buf[offset + k] = digits[n_digits - 1 - k]
+        return n_digits
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _advance_nonce(buf, offset, n_digits, step):
+        """
+        把 buf[offset:offset+n_digits] 中的十进制 ASCII 数原地加上 step（从最低位逐位进位）
+
+        Returns:
+            位数不变返回 True；最高位溢出（位数增加）返回 False，此时需调用 _write_nonce 重写
+        """
+        carry = step
+        i = offset + n_digits - 1
+        while carry and i >= offset:
+            v = buf[i] - 48 + carry
+            buf[i] = 48 + v % 10
+            carry = v // 10
+            i -= 1
+        return carry == 0
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _pad_message(buf, msg_len):
+        """写入 SHA-256 padding (0x80 + 0 + 64 位长度)，返回块数"""
+        n_blocks = (msg_len + 9 + 63) // 64
+        total = n_blocks * 64
+        buf[msg_len] = 0x80
+        for k in range(msg_len + 1, total - 8):
+            buf[k] = 0
+        bit_len = msg_len * 8
+        for k in range(8):
+            buf[total - 1 - k] = (bit_len >> (8 * k)) & 0xFF
+        return n_blocks
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _prefix_matches(state, target_words, full_words, remaining_bits, tail_mask):
+        """比较摘要前 target_bits 位: 整字直接比较，剩余位按掩码比较"""
+        for i in range(full_words):
+            if state[i] != target_words[i]:
+                return False
+        if remaining_bits and ((state[full_words] ^ target_words[full_words]) & tail_mask) != 0:
+            return False
+        return True
+
+    _HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _prng_njit(seed, length):
+        """
+        CapJSPoWSolver.prng 的 JIT 版本，直接输出十六进制 ASCII 字节
+
+        Args:
+            seed: 种子字符串的 Unicode 码点 (uint32[:])
+            length: 生成长度
+
+        Returns:
+            十六进制 ASCII 字节 (uint8[:])
+        """
+        # FNV-1a hash
+        hash_val = np.uint32(2166136261)
+        for i in range(seed.shape[0]):
+            hash_val ^= seed[i]
+            hash_val = np.uint32(hash_val + (hash_val << np.uint32(1)) + (hash_val << np.uint32(4)) +
+                                 (hash_val << np.uint32(7)) + (hash_val << np.uint32(8)) +
+                                 (hash_val << np.uint32(24)))
+
+        # Xorshift，每个 32 位字写出 8 个十六进制字符
+        state = hash_val
+        n = max(length, 0)
+        out = np.empty((n + 7) // 8 * 8, dtype=np.uint8)
+        for i in range(0, out.shape[0], 8):
+            state = np.uint32(state ^ (state << np.uint32(13)))
+            state = np.uint32(state ^ (state >> np.uint32(17)))
+            state = np.uint32(state ^ (state << np.uint32(5)))
+            for k in range(8):
+                out[i + k] = _HEX_DIGITS[(state >> np.uint32(28 - 4 * k)) & np.uint32(0xF)]
+        return out[:n]
+
+    @njit(cache=True, nogil=True, boundscheck=False)
+    def _solve_njit(salt, target, target_bits, start, step, max_iter, found, index):
+        """
+        在 nonce = start, start + step, ... (< max_iter) 中查找 sha256(salt || str(nonce))
+        前 target_bits 位等于 target 的 nonce
+
+        Args:
+            salt: 盐值字节 (uint8[:])
+            target: 目标前缀字节 (uint8[:])
+            target_bits: 需要匹配的位数
+            start: 起始 nonce
+            step: nonce 步长 (分片数)
+            max_iter: 最大尝试次数
+            found: 各 challenge 已找到的 nonce (int64[:], -1 表示未找到)，其他分片找到后提前退出
+            index: 本 challenge 在 found 中的下标
+
+        Returns:
+            本分片中最小的满足条件的 nonce，未找到或提前退出返回 -1
+        """
+        lanes = _LANES
+        salt_len = salt.shape[0]
+        n_iter = max(0, (max_iter - start + step - 1) // step)
+        # 每条通道一个消息缓冲区: salt + 最多 20 位数字 + 0x80 + 8 字节长度，按块对齐
+        bufs = np.zeros((lanes, ((salt_len + 20 + 9 + 63) // 64) * 64), dtype=np.uint8)
+        for l in range(lanes):
+            bufs[l, :salt_len] = salt
+        lane_len = np.full(lanes, -1, dtype=np.int64)
+        lane_blocks = np.zeros(lanes, dtype=np.int64)
+        digits = np.empty(20, dtype=np.uint8)
+
+        w = np.empty((64, lanes), dtype=np.uint32)
+        state = np.empty((8, lanes), dtype=np.uint32)
+        regs = np.empty((8, lanes), dtype=np.uint32)
+        t1 = np.empty(lanes, dtype=np.uint32)
+        w1 = np.empty(64, dtype=np.uint32)
+        state1 = np.empty(8, dtype=np.uint32)
+
+        # 目标前缀转为大端 32 位字
+        full_words = target_bits // 32
+        remaining_bits = target_bits % 32
+        target_words = np.zeros(full_words + 1, dtype=np.uint32)
+        for i in range(target.shape[0]):
+            target_words[i // 4] |= np.uint32(target[i]) << np.uint32(24 - 8 * (i % 4))
+        tail_mask = np.uint32((0xFFFFFFFF << (32 - remaining_bits)) & 0xFFFFFFFF)
+        first_mask = np.uint32(0xFFFFFFFF) if full_words else tail_mask
+
+        # salt 中完整的 64 字节块对所有 nonce 都相同: 预先压缩得到中间状态 (midstate)，
+        # 之后每个 nonce 只需从 midstate 出发压缩剩余的块
+        mid_blocks = salt_len // 64
+        midstate = _SHA256_IV.copy()
+        for blk in range(mid_blocks):
+            _sha256_compress(midstate, bufs[0], blk * 64, w1)
+
+        for base in range(0, n_iter, lanes):
+            if found[index] >= 0:
+                return -1
+            count = min(lanes, n_iter - base)
+
+            # 每条通道的 nonce 比上一批大 lanes * step，直接在缓冲区的 ASCII 数字上进位；
+            # 仅在位数变化时重写数字并重新填充 padding
+            same_blocks = True
+            for l in range(count):
+                msg_len = lane_len[l]
+                if msg_len < 0 or not _advance_nonce(bufs[l], salt_len, msg_len - salt_len, lanes * step):
+                    msg_len = salt_len + _write_nonce(bufs[l], salt_len, start + (base + l) * step, digits)
+                if msg_len != lane_len[l]:
+                    lane_blocks[l] = _pad_message(bufs[l], msg_len)
+                    lane_len[l] = msg_len
+                if lane_blocks[l] != lane_blocks[0]:
+                    same_blocks = False
+
+            if count == lanes and same_blocks:
+                for k in range(8):
+                    state[k, :] = midstate[k]
+                for blk in range(mid_blocks, lane_blocks[0]):
+                    _sha256_compress_lanes(state, bufs, blk * 64, w, regs, t1)
+                for l in range(lanes):
+                    # 先用第一个字快速排除，绝大多数通道在这里就不匹配
+                    if (state[0, l] ^ target_words[0]) & first_mask == 0 and \
+                            _prefix_matches(state[:, l], target_words, full_words, remaining_bits, tail_mask):
+                        return start + (base + l) * step
+            else:
+                # 末尾不足一批或块数不一致（数字位数跨越块边界）时逐个计算
+                for l in range(count):
+                    state1[:] = midstate
+                    for blk in range(mid_blocks, lane_blocks[l]):
+                        _sha256_compress(state1, bufs[l], blk * 64, w1)
+                    if _prefix_matches(state1, target_words, full_words, remaining_bits, tail_mask):
+                        return start + (base + l) * step
+
+        return -1
+
+
+# 可选: 显式选择 backend="cuda" 时，用 numba.cuda kernel 批量搜索 nonce
+# 每次启动 kernel 覆盖的 nonce 数和线程块大小，kernel 内按网格步长循环
+_CUDA_BATCH = 1 << 24
+_CUDA_THREADS = 256
+_CUDA_BLOCKS = 4096
+_CUDA_NOT_FOUND = (1 << 63) - 1
+
+# _get_cuda_solver 首次调用时才导入 numba.cuda 并缓存 GPU 求解函数
+cuda = None
+_cuda_solver = None
+
+
+def _get_cuda_solver():
+    """
+    首次使用 CUDA 后端时才导入 numba.cuda、检测 GPU 并定义 kernel，结果缓存
+
+    导入本模块（包括进程池子进程）不会初始化 CUDA 驱动
+
+    Returns:
+        _solve_batch_cuda 函数
+    """
+    global cuda, _cuda_solver
+    if _cuda_solver is None:
+        if not HAS_NUMBA:
+            raise Exception("CUDA backend requires numba")
+        try:
+            from numba import cuda
+        except ImportError:
+            raise Exception("CUDA backend is not available")
+        if not cuda.is_available():
+            raise Exception("CUDA backend is not available")
+        _cuda_solver = _build_cuda_solver()
+    return _cuda_solver
+
+
+def _build_cuda_solver():
+    """定义 CUDA device 函数和 kernel，返回批量求解函数"""
+
+    @cuda.jit(device=True)
+    def _rotr_device(x, n):
+        return np.uint32((x >> np.uint32(n)) | (x << np.uint32(32 - n)))
+
+    @cuda.jit(device=True)
+    def _sha256_compress_device(state, buf, offset, w, k):
+        """_sha256_compress 的 GPU 版本，state/buf/w 均为线程本地数组"""
+        for i in range(16):
+            j = offset + 4 * i
+            w[i] = (np.uint32(buf[j]) << np.uint32(24)) | (np.uint32(buf[j + 1]) << np.uint32(16)) | \
+                   (np.uint32(buf[j + 2]) << np.uint32(8)) | np.uint32(buf[j + 3])
+        for i in range(16, 64):
+            x = w[i - 15]
+            y = w[i - 2]
+            s0 = _rotr_device(x, 7) ^ _rotr_device(x, 18) ^ (x >> np.uint32(3))
+            s1 = _rotr_device(y, 17) ^ _rotr_device(y, 19) ^ (y >> np.uint32(10))
+            w[i] = np.uint32(w[i - 16] + s0 + w[i - 7] + s1)
+
+        a, b, c, d = state[0], state[1], state[2], state[3]
+        e, f, g, h = state[4], state[5], state[6], state[7]
+        for i in range(64):
+            s1 = _rotr_device(e, 6) ^ _rotr_device(e, 11) ^ _rotr_device(e, 25)
+            ch = np.uint32((e & f) ^ (~e & g))
+            t1 = np.uint32(h + s1 + ch + k[i] + w[i])
+            s0 = _rotr_device(a, 2) ^ _rotr_device(a, 13) ^ _rotr_device(a, 22)
+            maj = (a & b) ^ (a & c) ^ (b & c)
+            t2 = np.uint32(s0 + maj)
+            h = g
+            g = f
+            f = e
+            e = np.uint32(d + t1)
+            d = c
+            c = b
+            b = a
+            a = np.uint32(t1 + t2)
+
+        state[0] = np.uint32(state[0] + a)
+        state[1] = np.uint32(state[1] + b)
+        state[2] = np.uint32(state[2] + c)
+        state[3] = np.uint32(state[3] + d)
+        state[4] = np.uint32(state[4] + e)
+        state[5] = np.uint32(state[5] + f)
+        state[6] = np.uint32(state[6] + g)
+        state[7] = np.uint32(state[7] + h)
+
+    @cuda.jit
+    def _solve_cuda_kernel(tails, salt_len, midstates, target_words, full_words, remaining_bits, tail_masks,
+                           base_nonce, n_nonces, found):
+        """
+        二维网格: y 为 challenge 下标，x 方向按网格步长搜索 [base_nonce, base_nonce + n_nonces)，
+        找到解时用 atomic.min 记录该 challenge 的最小 nonce
+
+        tails 为各 salt 去掉完整块后的尾部，midstates 为完整块压缩后的状态
+        """
+        k = cuda.const.array_like(_SHA256_K)
+        # 尾部最多 63 字节 + 20 位数字 + 9 字节 padding，不超过两个块
+        buf = cuda.local.array(128, dtype=np.uint8)
+        w = cuda.local.array(64, dtype=np.uint32)
+        state = cuda.local.array(8, dtype=np.uint32)
+        digits = cuda.local.array(20, dtype=np.uint8)
+
+        start, c = cuda.grid(2)
+        stride = cuda.gridsize(2)[0]
+        tail_len = tails.shape[1]
+        for i in range(tail_len):
+            buf[i] = tails[c, i]
+
+        for idx in range(start, n_nonces, stride):
+            nonce = base_nonce + idx
+            # 已找到更小的解（包括之前批次已求解的 challenge），本线程之后的 nonce 都不用再算
+            if nonce >= found[c]:
+                return
+
+            n = nonce
+            n_digits = 0
+            while True:
+                digits[n_digits] = 48 + n % 10
+                n //= 10
+                n_digits += 1
+                if n == 0:
+                    break
+            for i in range(n_digits):
+                buf[tail_len + i] = digits[n_digits - 1 - i]
+
+            # padding 按块内长度写入，长度字段使用完整消息 (salt + nonce) 的位数
+            msg_len = tail_len + n_digits
+            n_blocks = (msg_len + 9 + 63) // 64
+            total = n_blocks * 64
+            buf[msg_len] = 0x80
+            for i in range(msg_len + 1, total - 8):
+                buf[i] = 0
+            bit_len = (salt_len + n_digits) * 8
+            for i in range(8):
+                buf[total - 1 - i] = (bit_len >> (8 * i)) & 0xFF
+
+            for i in range(8):
+                state[i] = midstates[c, i]
+            for blk in range(n_blocks):
+                _sha256_compress_device(state, buf, blk * 64, w, k)
+
+            matched = True
+            for i in range(full_words[c]):
+                if state[i] != target_words[c, i]:
+                    matched = False
+                    break
+            if matched and remaining_bits[c] and \
+                    ((state[full_words[c]] ^ target_words[c, full_words[c]]) & tail_masks[c]) != 0:
+                matched = False
+            if matched:
+                cuda.atomic.min(found, c, nonce)
+
+    def _solve_batch_cuda(salts, targets, target_bits, max_iter, progress_callback=None):
+        """
+        在 GPU 上融合求解多个 challenge
+
+        按 _CUDA_BATCH 分批启动 kernel（网格 y 维为 challenge），批次按顺序执行，
+        因此每个 challenge 第一个有解的批次给出的就是它的最小解；所有 challenge 求解后提前结束
+
+        Args:
+            salts: 盐值字节 (uint8[C, s])，要求等长
+            targets: 目标前缀字节，按最长者补齐 (uint8[C, t])
+            target_bits: 每个 challenge 需要匹配的位数 (int64[C])
+            max_iter: 最大尝试次数
+            progress_callback: 进度回调 (已求解数, 总数)，每批结束后有新解时调用
+
+        Returns:
+            每个 challenge 最小的满足条件的 nonce (int64[C])，未找到为 -1
+        """
+        n_challenges, salt_len = salts.shape
+
+        # salt 的完整块在 CPU 上压缩一次得到 midstate，GPU 只处理尾部
+        mid_blocks = salt_len // 64
+        midstates = np.empty((n_challenges, 8), dtype=np.uint32)
+        w = np.empty(64, dtype=np.uint32)
+        for c in range(n_challenges):
+            midstates[c] = _SHA256_IV
+            for blk in range(mid_blocks):
+                _sha256_compress(midstates[c], salts[c], blk * 64, w)
+
+        n_words = targets.shape[1] // 4 + 1
+        target_words = np.zeros((n_challenges, n_words), dtype=np.uint32)
+        for i in range(targets.shape[1]):
+            target_words[:, i // 4] |= targets[:, i].astype(np.uint32) << np.uint32(24 - 8 * (i % 4))
+        full_words = (target_bits // 32).astype(np.int64)
+        remaining_bits = (target_bits % 32).astype(np.int64)
+        tail_masks = ((0xFFFFFFFF << (32 - remaining_bits)) & 0xFFFFFFFF).astype(np.uint32)
+
+        d_tails = cuda.to_device(np.ascontiguousarray(salts[:, mid_blocks * 64:]))
+        d_midstates = cuda.to_device(midstates)
+        d_target_words = cuda.to_device(target_words)
+        d_full_words = cuda.to_device(full_words)
+        d_remaining_bits = cuda.to_device(remaining_bits)
+        d_tail_masks = cuda.to_device(tail_masks)
+        d_found = cuda.to_device(np.full(n_challenges, _CUDA_NOT_FOUND, dtype=np.int64))
+
+        # 保持每次启动的总线程数大致不变
+        blocks_x = max(1, _CUDA_BLOCKS // n_challenges)
+        solved = 0
+        found = None
+        for base in range(0, max_iter, _CUDA_BATCH):
+            count = min(_CUDA_BATCH, max_iter - base)
+            grid = (min(blocks_x, (count + _CUDA_THREADS - 1) // _CUDA_THREADS), n_challenges)
+            _solve_cuda_kernel[grid, (_CUDA_THREADS, 1)](
+                d_tails, salt_len, d_midstates, d_target_words, d_full_words, d_remaining_bits, d_tail_masks,
+                base, count, d_found
+            )
+            found = d_found.copy_to_host()
+            now_solved = int(np.count_nonzero(found != _CUDA_NOT_FOUND))
+            if now_solved != solved:
+                solved = now_solved
+                if progress_callback:
+                    progress_callback(solved, n_challenges)
+            if solved == n_challenges:
+                break
+
+        results = np.full(n_challenges, -1, dtype=np.int64)
+        if found is not None:
+            results[found != _CUDA_NOT_FOUND] = found[found != _CUDA_NOT_FOUND]
+        return results
+
+    return _solve_batch_cuda
+
+
+def _parse_target(target: str) -> Tuple[bytes, int]:
+    """
+    把 hex 目标前缀转为字节 (奇数长度补 0) 和需要匹配的位数
+
+    Returns:
+        (target_bytes, target_bits)
+    """
+    if len(target) % 2 != 0:
+        target += '0'
+    return bytes.fromhex(target), len(target) * 4
+
+
+def solve_all(salts: List[bytes], targets: List[bytes], target_bits_list: List[int],
+              max_iterations: int = 10000000, progress_callback=None) -> List[int]:
+    """
+    在 GPU 上融合求解多个 challenge: 一次 kernel 启动覆盖所有 challenge (需要 numba.cuda)
+
+    CPU 上按 challenge 分别求解 (solve_challenges 的 thread/process 后端) 更快，因此没有 CPU 融合版本
+
+    Args:
+        salts: 盐值字节列表 (需等长)
+        targets: 目标前缀字节列表
+        target_bits_list: 每个目标需要匹配的位数
+        max_iterations: 最大尝试次数
+        progress_callback: 进度回调 (current, total)
+
+    Returns:
+        nonce 列表，未找到的位置为 -1
+    """
+    solver = _get_cuda_solver()
+    if not salts:
+        return []
+    if len({len(salt) for salt in salts}) != 1:
+        raise Exception("Fused solver requires salts of equal length")
+
+    n_challenges = len(salts)
+    salt_arr = np.frombuffer(b''.join(salts), dtype=np.uint8).reshape(n_challenges, len(salts[0]))
+    target_arr = np.zeros((n_challenges, max(len(t) for t in targets)), dtype=np.uint8)
+    for i, target_bytes in enumerate(targets):
+        target_arr[i, :len(target_bytes)] = np.frombuffer(target_bytes, dtype=np.uint8)
+    target_bits = np.array(target_bits_list, dtype=np.int64)
+
+    nonces = solver(salt_arr, target_arr, target_bits, max_iterations, progress_callback)
+    return [int(nonce) for nonce in nonces]
+
+
+def _solve_hashlib(salt_bytes: bytes, target_bytes: bytes, target_bits: int, start: int, step: int,
+                   max_iterations: int, found, index: int) -> int:
+    """
+    纯 Python (hashlib) 求解循环，参数含义同 _solve_njit
+
+    Returns:
+        找到的 nonce，未找到或被提前终止返回 -1
+    """
+    full_bytes = target_bits // 8
+    remaining_bits = target_bits % 8
+    # 整字节前缀预先切好，循环内用 startswith 一次比较，不再每次切片分配两个 bytes
+    target_prefix = target_bytes[:full_bytes]
+    check_tail = remaining_bits > 0 and full_bytes < len(target_bytes)
+    tail_mask = 0xFF << (8 - remaining_bits)
+    target_tail = target_bytes[full_bytes] & tail_mask if check_tail else 0
+
+    # 预先吸收 salt: 完整块已压缩进内部状态 (midstate)，尾部留在缓冲区，copy() 远比重新哈希便宜
+    base_hasher = _sha256(salt_bytes)
+    new_hasher = base_hasher.copy
+
+    # nonce 的十进制 ASCII 右对齐保存在固定缓冲区中，每次原地进位，避免 str()/encode() 分配
+    start_digits = str(start).encode('ascii')
+    digits = bytearray(b'0' * 20)
+    pos = 20 - len(start_digits)
+    digits[pos:] = start_digits
+    nonce_view = memoryview(digits)[pos:]
+
+    # 每 4096 个 nonce 检查一次其他分片是否已找到。
+    # 注: 按批构造消息再 map(sha256) + join/find 扫描实测比逐个 copy() midstate 更慢
+    # (salt 每次都要重新哈希，且 hashlib 对短消息不释放 GIL)，因此保持逐个计算
+    chunk = step * 4096
+    for chunk_start in range(start, max_iterations, chunk):
+        if found is not None and found[index] >= 0:
+            return -1
+
+        for nonce in range(chunk_start, min(chunk_start + chunk, max_iterations), step):
+            hasher = new_hasher()
+            hasher.update(nonce_view)
+            hash_result = hasher.digest()
+
+            if hash_result.startswith(target_prefix) and \
+                    (not check_tail or (hash_result[full_bytes] & tail_mask) == target_tail):
+                return nonce
+
+            i = 19
+            if step == 1:
+                while digits[i] == 57:  # '9'
+                    digits[i] = 48
+                    i -= 1
+                digits[i] += 1
+            else:
+                carry = step
+                while carry:
+                    carry, digit = divmod(digits[i] - 48 + carry, 10)
+                    digits[i] = 48 + digit
+                    i -= 1
+                i += 1
+            if i < pos:
+                pos = i
+                nonce_view = memoryview(digits)[pos:]
+
+    return -1
+
+
+def solve_single_challenge_ranged(salt: str, target: str, start: int, step: int,
+                                  max_iterations: int = 10000000, found=None, index: int = 0) -> int:
+    """
+    求解单个 PoW challenge 的一个分片: 只尝试 nonce = start, start + step, start + 2*step, ...
+
+    多个分片 (start = 0..step-1) 合起来覆盖 [0, max_iterations)，可以让一个困难的 challenge 同时用上多个核
+
+    Args:
+        salt: 盐值 (hex)
+        target: 目标前缀 (hex)
+        start: 起始 nonce
+        step: nonce 步长 (分片数)
+        max_iterations: 最大尝试次数
+        found: 共享的 int64 数组 (如 multiprocessing.RawArray('q'))，保存各 challenge 已找到的 nonce，
+               -1 表示未找到；本分片找到后写入，其他分片发现已写入后提前退出
+        index: 本 challenge 在 found 中的下标
+
+    Returns:
+        本分片中找到的 nonce，未找到或被提前终止返回 -1
+    """
+    salt_bytes = salt.encode('utf-8')
+    target_bytes, target_bits = _parse_target(target)
+
+    if HAS_NUMBA:
+        if found is None:
+            found_arr, found_index = np.full(1, -1, dtype=np.int64), 0
+        else:
+            found_arr, found_index = np.frombuffer(found, dtype=np.int64), index
+        nonce = _solve_njit(
+            np.frombuffer(salt_bytes, dtype=np.uint8),
+            np.frombuffer(target_bytes, dtype=np.uint8),
+            target_bits,
+            start,
+            step,
+            max_iterations,
+            found_arr,
+            found_index
+        )
+    else:
+        nonce = _solve_hashlib(salt_bytes, target_bytes, target_bits, start, step, max_iterations, found, index)
+
+    if nonce >= 0 and found is not None:
+        found[index] = nonce
+    return nonce
+
+
+# 进程池 worker 中由 _init_shard_worker 设置的共享 found 数组
+_shared_found = None
+
+
+def _init_shard_worker(found):
+    """ProcessPoolExecutor 初始化函数: 保存创建子进程时传入的共享数组"""
+    global _shared_found
+    _shared_found = found
+
+
+def _solve_shard(salt: str, target: str, start: int, step: int, max_iterations: int, index: int) -> int:
+    """在进程池 worker 中求解一个分片"""
+    return solve_single_challenge_ranged(salt, target, start, step, max_iterations, _shared_found, index)
+
+
+def solve_single_challenge(salt: str, target: str, max_iterations: int = 10000000) -> int:
+    """
+    求解单个 PoW challenge
+
+    Args:
+        salt: 盐值 (hex)
+        target: 目标前缀 (hex)
+        max_iterations: 最大尝试次数
+
+    Returns:
+        nonce，未找到返回 -1
+    """
+    return solve_single_challenge_ranged(salt, target, 0, 1, max_iterations)
+
 
 class CapJSPoWSolver:
     """Cap.js Proof of Work 完整实现"""
@@ -28,6 +759,27 @@ class CapJSPoWSolver:
         self.challenge_url = self.api_endpoint + 'challenge'
         self.redeem_url = self.api_endpoint + 'redeem'
 
+        # challenge 和 redeem 复用同一个连接 (keep-alive)，省去第二次 TCP + TLS 握手
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
+            'Accept': '*/*',
+            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+            'Origin': 'https://www.ohmygpt.com',
+            'Referer': 'https://www.ohmygpt.com/',
+            'Content-Type': 'application/json'
+        })
+
+    def close(self):
+        """关闭 HTTP 会话"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     @staticmethod
     def prng(seed: str, length: int) -> str:
         """
@@ -40,6 +792,11 @@ class CapJSPoWSolver:
         Returns:
             十六进制字符串
         """
+        if HAS_NUMBA:
+            # 按 Unicode 码点传入，与下面逐字符 ord() 的结果完全一致
+            seed_codes = np.frombuffer(seed.encode('utf-32-le'), dtype=np.uint32)
+            return _prng_njit(seed_codes, length).tobytes().decode('ascii')
+
         # FNV-1a hash
         hash_val = 2166136261
         for char in seed:
@@ -48,63 +805,19 @@ class CapJSPoWSolver:
                         (hash_val << 8) + (hash_val << 24)
             hash_val &= 0xFFFFFFFF
 
+        # Xorshift: 先生成所有 32 位字，再按大端打包后一次 hexlify，与逐个 format(rnd, '08x') 拼接结果相同
         state = hash_val
-        result = ''
-
-        def xorshift():
-            nonlocal state
+        n_words = max(0, (length + 7) // 8)
+        words = []
+        for _ in range(n_words):
             state ^= (state << 13) & 0xFFFFFFFF
             state ^= state >> 17
             state ^= (state << 5) & 0xFFFFFFFF
-            return state
-
-        while len(result) < length:
-            rnd = xorshift()
-            result += format(rnd, '08x')
-
-        return result[:length]
-
-    @staticmethod
-    def solve_single_challenge(salt: str, target: str, max_iterations: int = 10000000) -> Optional[int]:
-        """
-        求解单个 PoW challenge
-
-        Args:
-            salt: 盐值 (hex)
-            target: 目标前缀 (hex)
-            max_iterations: 最大尝试次数
-
-        Returns:
-            nonce 或 None
-        """
-        salt_bytes = salt.encode('utf-8')
-
-        if len(target) % 2 != 0:
-            target += '0'
-        target_bytes = bytes.fromhex(target)
-        target_bits = len(target) * 4
-
-        full_bytes = target_bits // 8
-        remaining_bits = target_bits % 8
+            words.append(state)
 
-        for nonce in range(max_iterations):
-            nonce_str = str(nonce)
-            nonce_bytes = nonce_str.encode('utf-8')
+        return binascii.hexlify(struct.pack(f'>{n_words}I', *words))[:length].decode('ascii')
 
-            hasher = hashlib.sha256()
-            hasher.update(salt_bytes)
-            hasher.update(nonce_bytes)
-            hash_result = hasher.digest()
-
-            if hash_result[:full_bytes] == target_bytes[:full_bytes]:
-                if remaining_bits > 0 and full_bytes < len(target_bytes):
-                    mask = 0xFF << (8 - remaining_bits)
-                    if (hash_result[full_bytes] & mask) == (target_bytes[full_bytes] & mask):
-                        return nonce
-                else:
-                    return nonce
-
-        return None
+    solve_single_challenge = staticmethod(solve_single_challenge)
 
     def generate_challenges(self, challenge_token: str, c: int, s: int, d: int) -> List[Tuple[str, str]]:
         """
@@ -126,35 +839,76 @@ class CapJSPoWSolver:
             challenges.append((salt, target))
         return challenges
 
-    def solve_challenges(self, challenges: List[Tuple[str, str]], workers: int = 4,
-                        max_iterations: int = 10000000, progress_callback=None) -> List[int]:
+    def solve_challenges(self, challenges: List[Tuple[str, str]], workers: Optional[int] = None,
+                        max_iterations: int = 10000000, progress_callback=None,
+                        backend: str = "auto") -> List[int]:
         """
         并行求解所有 challenges
 
         Args:
             challenges: [(salt, target), ...] 列表
-            workers: 线程数
+            workers: 并行数，默认 CPU 核数；多于 challenge 数时每个 challenge 拆成多个分片并行搜索
             max_iterations: 最大尝试次数
             progress_callback: 进度回调 (current, total)
+            backend: "cuda" / "thread" / "process" / "auto"
+                     (cuda: 用 solve_all 在 GPU 上一次融合求解全部 challenge；
+                      auto: numba 内核释放 GIL 用线程，纯 Python 回退受 GIL 限制用进程；
+                      cuda 没有实测收益前不会被 auto 选中，需要显式指定)
 
         Returns:
             nonce 列表
         """
-        results = [None] * len(challenges)
+        if backend == "auto":
+            backend = "thread" if HAS_NUMBA else "process"
+
+        if backend == "cuda":
+            parsed = [_parse_target(target) for _, target in challenges]
+            results = solve_all(
+                [salt.encode('utf-8') for salt, _ in challenges],
+                [target_bytes for target_bytes, _ in parsed],
+                [target_bits for _, target_bits in parsed],
+                max_iterations=max_iterations,
+                progress_callback=progress_callback
+            )
+            self._check_solutions(results)
+            return results
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, workers)
+
+        # 核数多于 challenge 数时，把每个 challenge 拆成 shards 个分片 (nonce 按步长交错)，
+        # 任一分片找到解后写入共享数组，其余分片随即退出
+        shards = max(1, workers // max(1, len(challenges)))
+        found = multiprocessing.RawArray('q', [-1] * len(challenges))
+
+        if backend == "thread":
+            executor = ThreadPoolExecutor(max_workers=workers)
+            shard_fn = partial(solve_single_challenge_ranged, found=found)
+        elif backend == "process":
+            # 共享数组只能在创建子进程时传入
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker, initargs=(found,))
+            shard_fn = _solve_shard
+        else:
+            raise Exception(f"Unknown backend: {backend}")
+
+        results = [-1] * len(challenges)
         completed = 0
 
-        with ThreadPoolExecutor(max_workers=workers) as executor:
+        with executor:
             future_to_index = {
-                executor.submit(self.solve_single_challenge, salt, target, max_iterations): i
+                executor.submit(shard_fn, salt, target, shard, shards, max_iterations, index=i): i
                 for i, (salt, target) in enumerate(challenges)
+                for shard in range(shards)
             }
 
             for future in as_completed(future_to_index):
                 index = future_to_index[future]
                 try:
                     nonce = future.result()
-                    if nonce is None:
-                        raise Exception(f"Failed to solve challenge #{index}")
+                    # 未找到 (含被其他分片提前终止) 返回 -1，全部结束后统一检查
+                    if nonce < 0 or results[index] >= 0:
+                        continue
                     results[index] = nonce
                     completed += 1
 
@@ -165,8 +919,22 @@ class CapJSPoWSolver:
                     print(f"[PoW] Error solving challenge #{index}: {e}")
                     raise
 
+        self._check_solutions(results)
         return results
 
+    @staticmethod
+    def _check_solutions(results: List[int]):
+        """
+        检查求解结果，有未求解的 challenge 时汇总成一个异常抛出
+
+        Args:
+            results: nonce 列表 (-1 表示未找到)
+        """
+        failed = [index for index, nonce in enumerate(results) if nonce < 0]
+        if failed:
+            print(f"[PoW] Failed to solve {len(failed)}/{len(results)} challenges: {failed}")
+            raise Exception(f"Failed to solve challenges: {failed}")
+
     def get_challenge(self) -> Dict:
         """
         获取 challenge
@@ -175,16 +943,8 @@ class CapJSPoWSolver:
             {challenge: {c, s, d}, token, expires}
         """
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36',
-                'Accept': '*/*',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Origin': 'https://www.ohmygpt.com',
-                'Referer': 'https://www.ohmygpt.com/',
-                'Content-Type': 'application/json'
-            }
             # 注意: challenge 端点使用 POST 而不是 GET!
-            response = requests.post(self.challenge_url, json={}, headers=headers, timeout=10)
+            response = self.session.post(self.challenge_url, json={}, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -206,23 +966,18 @@ class CapJSPoWSolver:
                 "token": challenge_token,
                 "solutions": solutions
             }
-            response = requests.post(
-                self.redeem_url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
+            response = self.session.post(self.redeem_url, json=payload, timeout=10)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             raise Exception(f"Failed to redeem token: {e}")
 
-    def solve(self, workers: int = 4, progress_callback=None) -> str:
+    def solve(self, workers: Optional[int] = None, progress_callback=None) -> str:
         """
         完整的 PoW 求解流程
 
         Args:
-            workers: 并行线程数
+            workers: 并行数，默认 CPU 核数
             progress_callback: 进度回调
 
         Returns:
@@ -248,7 +1003,7 @@ class CapJSPoWSolver:
         challenges = self.generate_challenges(challenge_token, c, s, d)
 
         # 步骤3: 求解
-        print(f"[PoW] 步骤3: 并行求解 (workers={workers})...")
+        print(f"[PoW] 步骤3: 并行求解 (workers={workers or 'auto'})...")
         solve_start = time.time()
 
         solutions = self.solve_challenges(
@@ -277,25 +1032,25 @@ class CapJSPoWSolver:
         return powt
 
 
-def get_powt(workers: int = 4) -> str:
+def get_powt(workers: Optional[int] = None) -> str:
     """
     简化的获取 powt 函数
 
     Args:
-        workers: 并行线程数
+        workers: 并行数，默认 CPU 核数
 
     Returns:
         powt token
     """
-    solver = CapJSPoWSolver()
-    return solver.solve(workers=workers)
+    with CapJSPoWSolver() as solver:
+        return solver.solve(workers=workers)
 
 
 if __name__ == "__main__":
     print("=== OhMyGPT PoW 纯 Python 求解器 ===\n")
 
     try:
-        powt = get_powt(workers=4)
+        powt = get_powt()
         print(f"\n✅ 成功获取 PoWT: {powt}")
 
     except Exception as e: